@@ -1,28 +1,6 @@
-import os
 import argparse
-import pandas as pd 
 from pathlib import Path
 
-from src.bootstrap import ensure_opening_data, build_opening_tables, save_opening_tables
-from src.engine_fifo import (
-    load_inventory,
-    load_trades,
-    inventory_df_to_queues,
-    apply_trades_fifo,
-    save_inventories,
-    save_realized_pnl,
-    load_actions,
-)
-from src.dividends import (
-    load_dividens,
-    prepare_dividends_for_year,
-    build_needed_snapshot_map,
-    compute_dividend_ledger,
-    save_dividend_ledger,
-)
-from src.snapshots import SnapshotCollector
-from src.annual_report import build_annual_report, save_annual_report   
-
 
 def main():
     parser = argparse.ArgumentParser(
@@ -50,8 +28,44 @@ def main():
         help="Directory to store opening tables (default: ./data)"
     )
 
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print full inventories and the realized PnL table"
+    )
+
+    parser.add_argument(
+        "--no-xlsx",
+        action="store_true",
+        help="Only write the HTML annual report (skip the Excel workbook)"
+    )
+
     args = parser.parse_args()
 
+    # heavy imports (pandas & friends) only once the arguments are valid,
+    # so --help / usage errors return immediately
+    import pandas as pd
+
+    from src.bootstrap import ensure_opening_data, build_opening_tables, save_opening_tables
+    from src.engine_fifo import (
+        load_inventory,
+        load_trades,
+        inventory_df_to_queues,
+        apply_trades_fifo,
+        save_inventories,
+        save_realized_pnl,
+        load_actions,
+    )
+    from src.dividends import (
+        load_dividens,
+        prepare_dividends_for_year,
+        build_needed_snapshot_map,
+        compute_dividend_ledger,
+        save_dividend_ledger,
+    )
+    from src.snapshots import SnapshotCollector
+    from src.annual_report import build_annual_report, save_annual_report
+
     year = args.year
     is_start_year = args.is_start
     data_dir = Path(args.data_dir)
@@ -79,8 +93,10 @@ def main():
 
     inventories = inventory_df_to_queues(inv_df)
 
-    for symbol, queue in inventories.items():
-        print(f"Inventory for {symbol}: {list(queue)}\n")
+    print(f"Loaded {len(inventories)} symbols, {sum(len(q) for q in inventories.values())} lots")
+    if args.verbose:
+        for symbol, queue in inventories.items():
+            print(f"Inventory for {symbol}: {list(queue)}\n")
 
     actions_df = load_actions(data_dir, year)  
 
@@ -103,9 +119,11 @@ def main():
         snapshot_collector=collector,
     )
 
-    print("Updated Inventory:", inventory)
-    print("Realized PnL DataFrame:")
-    print(realized_pnl_df)
+    # printing whole inventories / DataFrames formats every row: opt-in only
+    if args.verbose:
+        print("Updated Inventory:", inventory)
+        print("Realized PnL DataFrame:")
+        print(realized_pnl_df)
 
     save_inventories(data_dir, year, inventories)
     save_realized_pnl(data_dir, year, realized_pnl_df)
@@ -118,7 +136,7 @@ def main():
 
     
     report = build_annual_report(data_dir, year)
-    save_annual_report(data_dir, year,report)
+    save_annual_report(data_dir, year, report, xlsx=not args.no_xlsx)
 
 
     print('finished')
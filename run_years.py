@@ -0,0 +1,70 @@
+import argparse
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+def build_and_save(data_dir: Path, xlsx: bool, year: int) -> dict:
+    from src.annual_report import build_annual_report, save_annual_report
+
+    report = build_annual_report(data_dir, year)
+    return save_annual_report(data_dir, year, report, xlsx=xlsx)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild annual reports for several already-processed years in parallel."
+    )
+
+    parser.add_argument(
+        "years",
+        type=int,
+        nargs="+",
+        help="Years to report on (each must already have been run through run_year.py)"
+    )
+
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default="data",
+        help="Directory holding the yearly data (default: ./data)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: one per CPU)"
+    )
+
+    parser.add_argument(
+        "--no-xlsx",
+        action="store_true",
+        help="Only write the HTML annual reports (skip the Excel workbooks)"
+    )
+
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    years = sorted(set(args.years))
+
+    # parse close_price.csv once up front so every worker reads the shared
+    # parquet sidecar instead of re-parsing (and racing to write) it
+    from src.annual_report import load_close_prices
+    load_close_prices(data_dir)
+
+    # spawn: workers start clean instead of inheriting the parent's pandas state
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as ex:
+        results = ex.map(functools.partial(build_and_save, data_dir, not args.no_xlsx), years)
+        for year, paths in zip(years, results):
+            print(f"{year}:")
+            for k, v in paths.items():
+                print(f"  - {k}: {v}")
+
+    print('finished')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 # src/annual_report.py
 from __future__ import annotations
 
-from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    from src.cache import read_csv_cached
+except Exception:
+    from cache import read_csv_cached
 
 
 # -------------------------
@@ -18,8 +24,14 @@ def load_close_prices(data_dir: Path) -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"close_price.csv not found: {path}")
 
+    return read_csv_cached(path, _read_close_prices)
+
+
+def _read_close_prices(path: Path) -> pd.DataFrame:
+
     df = pd.read_csv(
         path,
+        usecols=["symbol", "date", "close_price"],
         dtype={"symbol": "string", "close_price": "float64"},
         parse_dates=["date"],
         skip_blank_lines=True,
@@ -27,9 +39,9 @@ def load_close_prices(data_dir: Path) -> pd.DataFrame:
     df["symbol"] = df["symbol"].astype("string").str.strip()
     df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.normalize()
 
-    bad = df[df["date"].isna() | df["close_price"].isna() | df["symbol"].isna()]
-    if not bad.empty:
-        raise ValueError(f"close_price.csv has invalid rows:\n{bad}")
+    bad_mask = df["date"].isna() | df["close_price"].isna() | df["symbol"].isna()
+    if bad_mask.any():
+        raise ValueError(f"close_price.csv has invalid rows:\n{df[bad_mask]}")
 
     return df
 
@@ -41,10 +53,12 @@ def load_realized_pnl(data_dir: Path, year: int) -> pd.DataFrame:
 
     df = pd.read_csv(
         path,
-        dtype={"stock_symbol": "string"},   
+        usecols=["transaction_date", "stock_symbol", "realized_pnl"],
+        dtype={"stock_symbol": "category", "realized_pnl": "float64"},
         parse_dates=["transaction_date"],
         skip_blank_lines=True,
     )
+    df["stock_symbol"] = _symbol_key(df["stock_symbol"])
     return df
 
 
@@ -54,13 +68,14 @@ def load_dividend_ledger(data_dir: Path, year: int) -> pd.DataFrame:
     if not path.exists():
         return pd.DataFrame(columns=["symbol", "dividend_amount"])
 
+    # only symbol / amount feed the report; older ledgers may lack the amount
     df = pd.read_csv(
         path,
-        dtype={"symbol": "string"},
-        parse_dates=["ex_dividend_date", "snapshot_date"],
+        usecols=lambda c: c in {"symbol", "dividend_amount"},
+        dtype={"symbol": "category", "dividend_amount": "float64"},
         skip_blank_lines=True,
     )
-    df["symbol"] = df["symbol"].astype("string").str.strip()
+    df["symbol"] = _symbol_key(df["symbol"])
     if "dividend_amount" not in df.columns:
         df["dividend_amount"] = 0.0
     return df
@@ -72,13 +87,18 @@ def load_year_end_inventory(data_dir: Path, year: int) -> pd.DataFrame:
     if not path.exists():
         return pd.DataFrame(columns=["transaction_date", "stock_symbol", "qty", "price"])
 
+    return read_csv_cached(path, _read_year_end_inventory, helpers=[_symbol_key])
+
+
+def _read_year_end_inventory(path: Path) -> pd.DataFrame:
+
     df = pd.read_csv(
         path,
-        dtype={"stock_symbol": "string", "qty": "Int64", "price": "float64"},
-        parse_dates=["transaction_date"],
+        usecols=["stock_symbol", "qty", "price"],
+        dtype={"stock_symbol": "category", "qty": "Int64", "price": "float64"},
         skip_blank_lines=True,
     )
-    df["stock_symbol"] = df["stock_symbol"].astype("string").str.strip()
+    df["stock_symbol"] = _symbol_key(df["stock_symbol"])
     return df
 
 
@@ -86,45 +106,111 @@ def load_year_end_inventory(data_dir: Path, year: int) -> pd.DataFrame:
 # Transform
 # -------------------------
 
+def _symbol_key(s: pd.Series) -> pd.Series:
+    """
+    `s` as a categorical, whitespace-stripped symbol key.
+
+    Stripping renames the categories, so it costs O(distinct symbols) on
+    the categorical columns the loaders return; other input (e.g. frames
+    built by hand) is converted first. Categories are object dtype
+    everywhere, so union_categoricals can align keys from several sources.
+    """
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("string").astype("category")
+
+    stripped = s.cat.categories.astype(object).str.strip()
+    if stripped.is_unique:
+        return s.cat.rename_categories(stripped)
+
+    # categories that collapse onto the same stripped symbol share one code;
+    # the trailing -1 keeps missing symbols (code -1) missing
+    new_codes, symbols = pd.factorize(stripped, sort=True)
+    codes = np.append(new_codes, -1)[s.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=symbols), index=s.index, name=s.name)
+
+
+def _sum_by_symbol(rows: pd.DataFrame, min_count: int = 0) -> pd.DataFrame:
+    """
+    Sum every value column of `rows` per `symbol`.
+
+    `symbol` must already be a stripped categorical key (see `_symbol_key`),
+    so the groupby runs on its integer codes. The returned `symbol` column
+    is plain `string` again, ready for joins.
+    """
+    out = rows.drop(columns="symbol").groupby(rows["symbol"], observed=True).sum(min_count=min_count).reset_index()
+    out["symbol"] = out["symbol"].astype("string")
+    return out
+
 def get_year_end_prices(close_prices_df: pd.DataFrame, year: int) -> pd.DataFrame:
 
-    df = close_prices_df.copy()
-    df = df[df["date"].dt.year == year].copy()
-    df = df.sort_values(["symbol", "date"]).reset_index(drop=True)
-    return df
+    return close_prices_df.loc[close_prices_df["date"].dt.year == year].sort_values(
+        ["symbol", "date"], ignore_index=True
+    )
 
 
-def summarize_inventory_lots(inv_lots_df: pd.DataFrame) -> pd.DataFrame:
+# per-symbol contributions: (symbol, <value columns>) rows, or None if nothing to add
 
-    if inv_lots_df is None or inv_lots_df.empty:
-        return pd.DataFrame(columns=["symbol", "year_end_qty", "total_cost", "avg_cost"])
+def _inventory_rows(inv_lots_df: pd.DataFrame) -> Optional[pd.DataFrame]:
 
-    df = inv_lots_df.copy()
+    if inv_lots_df is None or inv_lots_df.empty:
+        return None
 
     required = {"stock_symbol", "qty", "price"}
-    missing = required - set(df.columns)
+    missing = required - set(inv_lots_df.columns)
     if missing:
         raise ValueError(f"inventory.csv missing columns: {sorted(missing)}")
 
-    df["stock_symbol"] = df["stock_symbol"].astype("string")
-    df["qty"] = pd.to_numeric(df["qty"], errors="coerce")
-    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    symbol = _symbol_key(inv_lots_df["stock_symbol"])
+    qty = pd.to_numeric(inv_lots_df["qty"], errors="coerce")
+    price = pd.to_numeric(inv_lots_df["price"], errors="coerce")
 
-    df = df.dropna(subset=["stock_symbol", "qty", "price"]).copy()
-    df["qty"] = df["qty"].astype("int64")
-    df["price"] = df["price"].astype("float64")
+    valid = symbol.notna() & qty.notna() & price.notna()
+    qty = qty[valid].astype("int64")
+    price = price[valid].astype("float64")
 
-    df["cost"] = df["qty"] * df["price"]
+    # only the columns the aggregation needs are materialized
+    return pd.DataFrame({"symbol": symbol[valid], "year_end_qty": qty, "total_cost": qty * price})
 
-    out = (
-        df.groupby("stock_symbol", as_index=False)
-          .agg(
-              year_end_qty=("qty", "sum"),
-              total_cost=("cost", "sum"),
-          )
-          .rename(columns={"stock_symbol": "symbol"})
-    )
 
+def _realized_rows(realized_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+
+    if realized_df is None or realized_df.empty:
+        return None
+
+    if "stock_symbol" not in realized_df.columns or "realized_pnl" not in realized_df.columns:
+        return None
+
+    return pd.DataFrame({
+        "symbol": _symbol_key(realized_df["stock_symbol"]),
+        "realized_pnl": pd.to_numeric(realized_df["realized_pnl"], errors="coerce").fillna(0.0),
+    })
+
+
+def _dividend_rows(div_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+
+    if div_df is None or div_df.empty:
+        return None
+
+    if "symbol" not in div_df.columns:
+        return None
+
+    if "dividend_amount" in div_df.columns:
+        amount = pd.to_numeric(div_df["dividend_amount"], errors="coerce").fillna(0.0)
+    else:
+        amount = 0.0
+
+    return pd.DataFrame({
+        "symbol": _symbol_key(div_df["symbol"]),
+        "dividend_amount": amount,
+    })
+
+
+# per-symbol sums -> report tables
+
+def _holdings_from_sums(sums: pd.DataFrame) -> pd.DataFrame:
+
+    out = sums.loc[sums["year_end_qty"].notna(), ["symbol", "year_end_qty", "total_cost"]]
+    out["year_end_qty"] = out["year_end_qty"].astype("int64")
 
     out["avg_cost"] = (out["total_cost"] / out["year_end_qty"]).where(out["year_end_qty"] != 0, 0.0)
 
@@ -135,52 +221,43 @@ def summarize_inventory_lots(inv_lots_df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+def _total_from_sums(sums: pd.DataFrame, col: str) -> Tuple[pd.DataFrame, float]:
 
-def summarize_realized(realized_df: pd.DataFrame) -> Tuple[pd.DataFrame, float]:
+    by_symbol = sums.loc[sums[col].notna(), ["symbol", col]]
+    by_symbol[col] = by_symbol[col].round(2)
 
-    if realized_df is None or realized_df.empty:
-        empty = pd.DataFrame(columns=["symbol", "realized_pnl"])
-        return empty, 0.0
+    total = float(by_symbol[col].sum()) if not by_symbol.empty else 0.0
 
-    df = realized_df.copy()
-    if "stock_symbol" not in df.columns or "realized_pnl" not in df.columns:
-        empty = pd.DataFrame(columns=["symbol", "realized_pnl"])
-        return empty, 0.0
+    return by_symbol.sort_values(["symbol"]).reset_index(drop=True), round(total, 2)
 
-    df["stock_symbol"] = df["stock_symbol"].astype("string").str.strip()
-    df["realized_pnl"] = pd.to_numeric(df["realized_pnl"], errors="coerce").fillna(0.0)
 
-    by_symbol = df.groupby("stock_symbol", as_index=False)["realized_pnl"].sum()
-    by_symbol = by_symbol.rename(columns={"stock_symbol": "symbol"})
-    by_symbol["realized_pnl"] = by_symbol["realized_pnl"].round(2)
+def summarize_inventory_lots(inv_lots_df: pd.DataFrame) -> pd.DataFrame:
 
-    total = float(by_symbol["realized_pnl"].sum()) if not by_symbol.empty else 0.0
+    rows = _inventory_rows(inv_lots_df)
+    if rows is None:
+        return pd.DataFrame(columns=["symbol", "year_end_qty", "total_cost", "avg_cost"])
 
-    return by_symbol.sort_values(["symbol"]).reset_index(drop=True), round(total, 2)
+    return _holdings_from_sums(_sum_by_symbol(rows))
 
 
-def summarize_dividends(div_df: pd.DataFrame) -> Tuple[pd.DataFrame, float]:
+def summarize_realized(realized_df: pd.DataFrame) -> Tuple[pd.DataFrame, float]:
 
-    if div_df is None or div_df.empty:
-        empty = pd.DataFrame(columns=["symbol", "dividend_amount"])
+    rows = _realized_rows(realized_df)
+    if rows is None:
+        empty = pd.DataFrame(columns=["symbol", "realized_pnl"])
         return empty, 0.0
 
-    df = div_df.copy()
-    if "symbol" not in df.columns:
-        empty = pd.DataFrame(columns=["symbol", "dividend_amount"])
-        return empty, 0.0
+    return _total_from_sums(_sum_by_symbol(rows), "realized_pnl")
 
-    if "dividend_amount" not in df.columns:
-        df["dividend_amount"] = 0.0
 
-    df["symbol"] = df["symbol"].astype("string").str.strip()
-    df["dividend_amount"] = pd.to_numeric(df["dividend_amount"], errors="coerce").fillna(0.0)
+def summarize_dividends(div_df: pd.DataFrame) -> Tuple[pd.DataFrame, float]:
 
-    by_symbol = df.groupby("symbol", as_index=False)["dividend_amount"].sum()
-    by_symbol["dividend_amount"] = by_symbol["dividend_amount"].round(2)
+    rows = _dividend_rows(div_df)
+    if rows is None:
+        empty = pd.DataFrame(columns=["symbol", "dividend_amount"])
+        return empty, 0.0
 
-    total = float(by_symbol["dividend_amount"].sum()) if not by_symbol.empty else 0.0
-    return by_symbol.sort_values(["symbol"]).reset_index(drop=True), round(total, 2)
+    return _total_from_sums(_sum_by_symbol(rows), "dividend_amount")
 
 
 # -------------------------
@@ -190,19 +267,39 @@ def summarize_dividends(div_df: pd.DataFrame) -> Tuple[pd.DataFrame, float]:
 def build_annual_report(
     data_dir: Path,
     year: int,
+    close_prices_df: Optional[pd.DataFrame] = None,
 ) -> dict[str, pd.DataFrame]:
 
-    close_prices_df = load_close_prices(data_dir)
+    # callers building several years pass the already-loaded price history
+    if close_prices_df is None:
+        close_prices_df = load_close_prices(data_dir)
     year_end_prices_df = get_year_end_prices(close_prices_df, year)
 
     realized_df = load_realized_pnl(data_dir, year)
     div_ledger_df = load_dividend_ledger(data_dir, year)
     inv_lots_df = load_year_end_inventory(data_dir, year)
 
-    holdings_df = summarize_inventory_lots(inv_lots_df)
-
-    realized_by_symbol, realized_total = summarize_realized(realized_df)
-    dividends_by_symbol, dividends_total = summarize_dividends(div_ledger_df)
+    # one groupby over every per-symbol contribution; a metric stays NaN
+    # (min_count=1) for symbols that have no rows of that kind
+    sum_cols = ["symbol", "realized_pnl", "dividend_amount", "year_end_qty", "total_cost"]
+    contributions = [
+        rows
+        for rows in (_realized_rows(realized_df), _dividend_rows(div_ledger_df), _inventory_rows(inv_lots_df))
+        if rows is not None
+    ]
+    if contributions:
+        long_df = pd.concat(
+            [rows.drop(columns="symbol") for rows in contributions], ignore_index=True
+        ).reindex(columns=sum_cols)
+        # align the per-loader symbol categories instead of falling back to strings
+        long_df["symbol"] = union_categoricals([rows["symbol"] for rows in contributions])
+    else:
+        long_df = pd.DataFrame({c: pd.Series(dtype="category" if c == "symbol" else "float64") for c in sum_cols})
+    sums = _sum_by_symbol(long_df, min_count=1)
+
+    holdings_df = _holdings_from_sums(sums)
+    realized_by_symbol, realized_total = _total_from_sums(sums, "realized_pnl")
+    dividends_by_symbol, dividends_total = _total_from_sums(sums, "dividend_amount")
 
     # merge holdings with prices to compute market value & unrealized pnl
     prices = year_end_prices_df.rename(columns={"close_price": "year_end_close"}).copy()
@@ -238,11 +335,14 @@ def build_annual_report(
     )
 
     # a merged by_symbol view (optional but useful)
-    by_symbol = realized_by_symbol.merge(dividends_by_symbol, on="symbol", how="outer")
-    by_symbol = by_symbol.merge(
-        holdings_with_price[["symbol", "year_end_qty", "total_cost", "year_end_close", "year_end_market_value", "unrealized_pnl"]],
-        on="symbol",
-        how="outer",
+    # join on the symbol index instead of re-hashing the key column per merge
+    holdings_cols = ["year_end_qty", "total_cost", "year_end_close", "year_end_market_value", "unrealized_pnl"]
+    by_symbol = (
+        realized_by_symbol.set_index("symbol")
+        .join(dividends_by_symbol.set_index("symbol"), how="outer")
+        .join(holdings_with_price.set_index("symbol")[holdings_cols], how="outer")
+        .rename_axis("symbol")
+        .reset_index()
     )
     for c in ["realized_pnl", "dividend_amount", "unrealized_pnl"]:
         if c in by_symbol.columns:
@@ -260,10 +360,22 @@ def build_annual_report(
     }
 
 
+def build_annual_reports(
+    data_dir: Path,
+    years: list[int],
+) -> dict[int, dict[str, pd.DataFrame]]:
+    """
+    Build reports for several years, parsing close_price.csv only once.
+    """
+    close_prices_df = load_close_prices(data_dir)
+    return {year: build_annual_report(data_dir, year, close_prices_df) for year in years}
+
+
 def save_annual_report(
     data_dir: Path,
     year: int,
     report: dict[str, pd.DataFrame],
+    xlsx: bool = True,
 ) -> dict[str, Path]:
 
     out_dir = data_dir / f"{year}"
@@ -275,12 +387,7 @@ def save_annual_report(
     # -------------------------
     # HTML
     # -------------------------
-    def _df_to_html(df: pd.DataFrame) -> str:
-        if df is None or df.empty:
-            return "<p><em>(empty)</em></p>"
-        return df.to_html(index=False, border=0, classes="tbl")
-
-    html = f"""<!doctype html>
+    header = f"""<!doctype html>
     <html lang="zh-Hant">
     <head>
     <meta charset="utf-8"/>
@@ -308,56 +415,49 @@ def save_annual_report(
       <p class="meta">
         產生時間：{pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")}
       </p>
+    """
 
-      <div class="section">
-        <h2>年度損益總覽</h2>
-        <p class="meta">
-          本年度投資績效彙總，包含已實現損益、股利收入與期末未實現損益。
-        </p>
-        {_df_to_html(report.get("summary"))}
-      </div>
-
-      <div class="section">
-        <h2>標的別損益彙總</h2>
-        <p class="meta">
-          依股票代號彙整之年度損益明細（已實現損益＋股利＋期末未實現損益）。
-        </p>
-        {_df_to_html(report.get("by_symbol"))}
-      </div>
-
-      <div class="section">
-        <h2>期末持股明細</h2>
-        <p class="meta">
-          截至 {year} 年底之持股數量、成本、期末市值與未實現損益。
-        </p>
-        {_df_to_html(report.get("holdings_year_end"))}
-      </div>
+    sections = [
+        ("年度損益總覽", "本年度投資績效彙總，包含已實現損益、股利收入與期末未實現損益。", "summary"),
+        ("標的別損益彙總", "依股票代號彙整之年度損益明細（已實現損益＋股利＋期末未實現損益）。", "by_symbol"),
+        ("期末持股明細", f"截至 {year} 年底之持股數量、成本、期末市值與未實現損益。", "holdings_year_end"),
+        ("已實現損益（依標的）", "本年度賣出交易所產生之已實現損益。", "realized_by_symbol"),
+        ("股利收入（依標的）", "本年度除權息所取得之股利收入。", "dividends_by_symbol"),
+    ]
 
-      <div class="section">
-        <h2>已實現損益（依標的）</h2>
-        <p class="meta">
-          本年度賣出交易所產生之已實現損益。
-        </p>
-        {_df_to_html(report.get("realized_by_symbol"))}
-      </div>
+    # write section by section so only one table is rendered in memory at a time
+    with html_path.open("w", encoding="utf-8") as f:
+        f.write(header)
 
+        for title, meta, key in sections:
+            f.write(f"""
       <div class="section">
-        <h2>股利收入（依標的）</h2>
+        <h2>{title}</h2>
         <p class="meta">
-          本年度除權息所取得之股利收入。
+          {meta}
         </p>
-        {_df_to_html(report.get("dividends_by_symbol"))}
+        """)
+            df = report.get(key)
+            if df is None or df.empty:
+                f.write("<p><em>(empty)</em></p>")
+            else:
+                df.to_html(f, index=False, border=0, classes="tbl")
+            f.write("""
       </div>
+""")
 
+        f.write("""
     </body>
     </html>
-    """
+    """)
 
-    html_path.write_text(html, encoding="utf-8")
+    if not xlsx:
+        return {"html": html_path}
 
     # -------------------------
     # Excel (multi-sheet)
     # -------------------------
+    # pandas only imports openpyxl here, so HTML-only runs never load it
     with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
 
         sheets = [
@@ -0,0 +1,66 @@
+# src/cache.py
+from __future__ import annotations
+
+import hashlib
+import inspect
+import re
+from pathlib import Path
+from typing import Callable, Iterable
+
+import pandas as pd
+
+
+def _reader_tag(reader: Callable, helpers: Iterable[Callable] = ()) -> str:
+    """Short digest of the name and source of `reader` and `helpers`, so a changed loader gets a new sidecar."""
+    h = hashlib.sha1()
+    for func in (reader, *helpers):
+        h.update(func.__qualname__.encode())
+        try:
+            h.update(inspect.getsource(func).encode())
+        except (OSError, TypeError):
+            pass
+    return h.hexdigest()[:8]
+
+
+def read_csv_cached(
+    path: Path,
+    reader: Callable[[Path], pd.DataFrame],
+    helpers: Iterable[Callable] = (),
+) -> pd.DataFrame:
+    """
+    Load `path` via `reader`, keeping a parquet sidecar next to the CSV.
+
+    The sidecar (`<stem>.<tag>.parquet`) is tagged with the source of
+    `reader` and of the `helpers` it calls, so editing any of those starts
+    a fresh sidecar. Changes to code not listed there (other callees,
+    pandas itself) are not detected; delete the sidecar by hand then.
+    It is reused as long as it is not older than the CSV. Without a
+    parquet engine (pyarrow) installed this falls back to calling
+    `reader(path)` every time.
+    """
+    cache = path.with_name(f"{path.stem}.{_reader_tag(reader, helpers)}.parquet")
+    if cache.exists() and cache.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+        try:
+            return pd.read_parquet(cache)
+        except (ImportError, OSError, ValueError):
+            pass
+
+    df = reader(path)
+
+    try:
+        df.to_parquet(cache, index=False)
+    except (ImportError, OSError, ValueError):
+        # no parquet engine / read-only dir: cache is best effort only
+        return df
+
+    # drop sidecars left behind by older versions of the reader: only our
+    # own names (<stem>.<8 hex>.parquet and the legacy <stem>.parquet)
+    sidecar = re.compile(rf"{re.escape(path.stem)}(\.[0-9a-f]{{8}})?\.parquet")
+    for stale in path.parent.glob(f"{path.stem}.*parquet"):
+        if stale != cache and sidecar.fullmatch(stale.name):
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+    return df
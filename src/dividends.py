@@ -1,24 +1,35 @@
-import os 
+import numpy as np
 import pandas as pd
 
 from pathlib import Path
-from collections import defaultdict
-from typing import List, Dict, Set, Tuple, Optional
+from typing import Dict
+
+try:
+    from src.cache import read_csv_cached
+    from src.snapshots import snapshots_to_series
+except Exception:
+    from cache import read_csv_cached
+    from snapshots import snapshots_to_series
 
 def load_dividens(data_dir: Path) -> pd.DataFrame:
     path = data_dir / "dividends_history.csv"
     if not path.exists():
         raise FileNotFoundError(f"Dividends file not found: {path}")
 
+    return read_csv_cached(path, _read_dividends_history, helpers=[_parse_any_dates])
+
+def _read_dividends_history(path: Path) -> pd.DataFrame:
     df = pd.read_csv(
         path,
+        usecols=["symbol", "ex_dividend_date", "dividends"],
         dtype={
             "symbol": "string",
+            "ex_dividend_date": "string",
             "dividends": "float64",
         },
-        parse_dates=["ex_dividend_date"],
         skip_blank_lines=True,
     )
+    df["ex_dividend_date"] = _parse_any_dates(df["ex_dividend_date"])
     return df
 
 def prepare_dividends_for_year(div_history_df: pd.DataFrame, year: int) -> pd.DataFrame:
@@ -28,32 +39,39 @@ def prepare_dividends_for_year(div_history_df: pd.DataFrame, year: int) -> pd.Da
     if div_history_df is None or div_history_df.empty:
         return pd.DataFrame(columns=["symbol", "ex_dividend_date", "dividends"])
 
-    df = div_history_df.copy()
-    df["ex_dividend_date"] = pd.to_datetime(df["ex_dividend_date"]).dt.normalize()
-    df = df[df["ex_dividend_date"].dt.year == year].copy()
-    df = df.sort_values(["symbol", "ex_dividend_date"]).reset_index(drop=True)
-    return df
+    exd = pd.to_datetime(div_history_df["ex_dividend_date"]).dt.normalize()
+    mask = exd.dt.year == year
+
+    df = div_history_df.loc[mask].assign(ex_dividend_date=exd[mask])
+    return df.sort_values(["symbol", "ex_dividend_date"], ignore_index=True)
 
 def build_needed_snapshot_map(div_df_year: pd.DataFrame) -> list[pd.Timestamp]:
 
     if div_df_year is None or div_df_year.empty:
         return []
     
-    df = div_df_year.copy()
-    df["ex_dividend_date"] = pd.to_datetime(df["ex_dividend_date"]).dt.normalize()
-
-    snapshot_dates = (
-        df["ex_dividend_date"] - pd.Timedelta(days=1)
-    ).dt.normalize().unique().tolist()
+    # day-resolution datetime64 drops time-of-day; np.unique also sorts
+    ex_days = pd.to_datetime(div_df_year["ex_dividend_date"]).to_numpy("datetime64[D]")
+    snapshot_days = np.unique(ex_days - np.timedelta64(1, "D"))
 
-    return sorted(snapshot_dates)
+    return [pd.Timestamp(d) for d in snapshot_days]
 
 
 def compute_dividend_ledger(
     div_df_year: pd.DataFrame,
-    snapshots: Dict[pd.Timestamp, Dict[str, int]],
+    snapshots: Dict[pd.Timestamp, Dict[str, int]] | pd.Series,
 ) -> pd.DataFrame:
-    
+    """
+    Join each dividend with the inventory snapshot taken the day before
+    its ex-dividend date.
+
+    `snapshots` is either snapshot_date -> {symbol: qty} or the
+    (snapshot_date, symbol)-indexed Series from SnapshotCollector.to_series().
+
+    A datetime `ex_dividend_date` column is taken as already normalized
+    (as returned by prepare_dividends_for_year); other columns are parsed
+    and normalized here.
+    """
     cols = [
         "symbol",
         "ex_dividend_date",
@@ -66,32 +84,34 @@ def compute_dividend_ledger(
     if div_df_year is None or div_df_year.empty:
         return pd.DataFrame(columns=cols)
 
-    df = div_df_year.copy()
-    df["symbol"] = df["symbol"].astype("string").str.strip()
-    df["ex_dividend_date"] = pd.to_datetime(df["ex_dividend_date"]).dt.normalize()
-
-    records = []
-
-    for r in df.itertuples(index=False):
-        symbol = str(r.symbol).strip()
-        exd = pd.to_datetime(r.ex_dividend_date).normalize()
-        snap_date = (exd - pd.Timedelta(days=1)).normalize()
-        per_share = float(r.dividends)
-
-        snap = snapshots.get(snap_date, {})
-        eligible_qty = int(snap.get(symbol, 0))
-        amount = round(eligible_qty * per_share,0)
+    symbol = div_df_year["symbol"].astype("string").str.strip()
+    exd = div_df_year["ex_dividend_date"]
+    if not pd.api.types.is_datetime64_any_dtype(exd):
+        exd = pd.to_datetime(exd).dt.normalize()
+    snap_date = exd - pd.Timedelta(days=1)
+    per_share = div_df_year["dividends"].to_numpy(dtype=np.float64)
+
+    if not isinstance(snapshots, pd.Series):
+        snapshots = snapshots_to_series(snapshots)
+
+    # one hash lookup for all rows; missing (date, symbol) pairs hold nothing
+    eligible = (
+        snapshots.reindex(pd.MultiIndex.from_arrays([snap_date, symbol]))
+        .fillna(0)
+        .to_numpy(dtype=np.int64)
+    )
 
-        records.append({
-            "symbol": symbol,
-            "ex_dividend_date": exd,
-            "snapshot_date": snap_date,
-            "eligible_qty": eligible_qty,
+    return pd.DataFrame(
+        {
+            "symbol": symbol.array,
+            "ex_dividend_date": exd.to_numpy(),
+            "snapshot_date": snap_date.to_numpy(),
+            "eligible_qty": eligible,
             "dividends_per_share": per_share,
-            "dividend_amount": amount,
-        })
-
-    return pd.DataFrame(records, columns=cols)
+            "dividend_amount": np.round(eligible * per_share, 0),
+        },
+        columns=cols,
+    )
 
 def save_dividend_ledger(output_path: Path, dividend_ledger_df: pd.DataFrame) -> Path:
     """
@@ -101,26 +121,25 @@ def save_dividend_ledger(output_path: Path, dividend_ledger_df: pd.DataFrame) ->
     dividend_ledger_df.to_csv(output_path, index=False)
     return output_path
 
-def _parse_any_date(x) -> pd.Timestamp:
+def _parse_any_dates(s: pd.Series) -> pd.Series:
     """
-    Parse a date that may be:
+    Parse a column of dates whose cells may be:
       - 'YYYY/MM/DD'
       - 'YYYY-MM-DD'
+      - 'YYYYMMDD'
       - Excel serial number (e.g., 45953)
+    Only digit strings of up to 5 digits are taken as serials (99999 is
+    year 2173); longer ones such as 20230105 go through the text parser.
+    Empty / unparseable cells become NaT.
     """
-    if pd.isna(x):
-        return pd.NaT
-
-    s = str(x).strip()
-    if not s:
-        return pd.NaT
+    s = s.astype("string").str.strip()
+    is_serial = s.str.fullmatch(r"\d{1,5}").fillna(False).astype(bool)
 
-    # Excel serial number
-    if s.isdigit():
-        # Pandas uses 1899-12-30 as origin for Excel serial dates
-        return pd.to_datetime(int(s), unit="D", origin="1899-12-30", errors="coerce")
+    # Pandas uses 1899-12-30 as origin for Excel serial dates
+    serial = pd.to_datetime(s[is_serial].astype("int64"), unit="D", origin="1899-12-30", errors="coerce")
+    text = pd.to_datetime(s[~is_serial], format="mixed", errors="coerce")
 
-    return pd.to_datetime(s, errors="coerce")
+    return serial.combine_first(text).reindex(s.index)
 
 if __name__ == "__main__":
 
@@ -1,8 +1,9 @@
 import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from collections import deque, defaultdict
-from typing import Dict, Deque, List, Optional, Tuple
+from typing import Callable, Dict, Deque, Iterator, List, Optional
 from dataclasses import dataclass
 
 # NOTE:
@@ -31,21 +32,151 @@ except Exception:
         save_dividend_ledger,
     )
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: without it the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 @dataclass
 class Lot:
     qty: int
     price: float
     date: pd.Timestamp
 
+
+class InventoryBook:
+    """
+    FIFO lots of one symbol, stored as parallel numpy arrays.
+
+    Live lots are `qty/price/date[head:tail]`, oldest first. Selling
+    advances `head` (or shrinks the lot at `head`), buying writes at
+    `tail`; the buffers double when full. Iterating yields `Lot` views.
+    `total` is the live quantity, kept up to date by every mutation.
+    """
+
+    __slots__ = ("qty", "price", "date", "head", "tail", "total")
+
+    def __init__(self, capacity: int = 8):
+        self.qty = np.empty(capacity, dtype=np.int64)
+        self.price = np.empty(capacity, dtype=np.float64)
+        self.date = np.empty(capacity, dtype="datetime64[ns]")
+        self.head = 0
+        self.tail = 0
+        self.total = 0
+
+    @classmethod
+    def from_arrays(cls, qty: np.ndarray, price: np.ndarray, date: np.ndarray) -> "InventoryBook":
+        """Book holding the given lots, oldest first."""
+        n = len(qty)
+        book = cls(capacity=max(n, 8))
+        book.qty[:n] = qty
+        book.price[:n] = price
+        book.date[:n] = date
+        book.tail = n
+        book.total = int(book.qty[:n].sum())
+        return book
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    def __iter__(self) -> Iterator[Lot]:
+        for i in range(self.head, self.tail):
+            yield Lot(qty=int(self.qty[i]), price=float(self.price[i]), date=pd.Timestamp(self.date[i]))
+
+    def __repr__(self) -> str:
+        return f"InventoryBook({list(self)})"
+
+    def _reserve(self, n: int) -> None:
+        """Make room for `n` more lots after `tail` (compacting live lots to the front)."""
+        if self.tail + n <= len(self.qty):
+            return
+
+        live = len(self)
+        capacity = max(len(self.qty), 8)
+        while capacity < live + n:
+            capacity *= 2
+
+        for name in ("qty", "price", "date"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:live] = old[self.head:self.tail]
+            setattr(self, name, new)
+
+        self.head = 0
+        self.tail = live
+
+    def append(self, qty: int, price: float, date: pd.Timestamp) -> None:
+        self._reserve(1)
+        self.qty[self.tail] = qty
+        self.price[self.tail] = price
+        self.date[self.tail] = np.datetime64(date, "ns")
+        self.tail += 1
+        self.total += qty
+
+    def split(self, k: int) -> None:
+        """Apply a k-for-1 split to every live lot."""
+        self.qty[self.head:self.tail] *= k
+        self.price[self.head:self.tail] /= k
+        self.total *= k
+
+    def total_qty(self) -> int:
+        return self.total
+
+
+@njit(cache=True)
+def fifo_match(qty_buf, price_buf, head, tail, sell_qty, sell_price,
+               out_sell_qty, out_buy_price, out_lot_idx, out_pnl, out_idx):
+    """
+    Sell `sell_qty` out of the lots qty_buf/price_buf[head:tail], oldest first.
+
+    Every lot touched writes one row at out_*[out_idx] (out_lot_idx is the
+    lot's slot, for looking up its date). A partly sold lot keeps its slot
+    with the residual qty. Returns (new_head, new_out_idx, unfilled_qty);
+    unfilled_qty > 0 means the inventory ran out.
+    """
+    remaining = sell_qty
+    while remaining > 0 and head < tail:
+        lot_qty = qty_buf[head]
+        lot_price = price_buf[head]
+
+        q = min(lot_qty, remaining)
+        remaining -= q
+
+        out_sell_qty[out_idx] = q
+        out_buy_price[out_idx] = lot_price
+        out_lot_idx[out_idx] = head
+        out_pnl[out_idx] = q * (sell_price - lot_price)
+        out_idx += 1
+
+        if lot_qty - q > 0:
+            qty_buf[head] = lot_qty - q
+        else:
+            head += 1
+
+    return head, out_idx, remaining
+
+
+def _get_book(inventories: Dict[str, InventoryBook], symbol: str) -> InventoryBook:
+    book = inventories.get(symbol)
+    if book is None:
+        book = inventories[symbol] = InventoryBook()
+    return book
+
 def load_inventory(data_dir: Path, year: int) -> pd.DataFrame:
     path = data_dir / f"{year}" / "inventory.csv"
     if not path.exists():
         raise FileNotFoundError(f"Inventory file not found: {path}")
 
+    # callable usecols: the --is-start template has no price column
     df = pd.read_csv(
         path,
+        usecols=lambda c: c in {"transaction_date", "stock_symbol", "qty", "price"},
         dtype={
-            "stock_symbol": "string",
+            "stock_symbol": pd.CategoricalDtype(),
             "qty": "Int64",
             "price": "float64",
         },
@@ -59,14 +190,15 @@ def load_trades(data_dir: Path, year: int) -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"Trades file not found: {path}")
 
+    # symbol / side are low-cardinality: read them as categoricals
     df = pd.read_csv(
         path,
+        usecols=["transaction_date", "stock_symbol", "side", "qty", "price"],
         dtype={
-            "stock_symbol": "string",
-            "side": "string",   # BUY/SELL
+            "stock_symbol": pd.CategoricalDtype(),
+            "side": pd.CategoricalDtype(),   # BUY/SELL
             "qty": "Int64",
             "price": "float64",
-            "total_price": "float64",
         },
         parse_dates=["transaction_date"],
         skip_blank_lines=True,
@@ -80,6 +212,7 @@ def load_actions(data_dir: Path, year: int) -> pd.DataFrame:
 
     df = pd.read_csv(
         path,
+        usecols=["action_date", "symbol", "action_type", "ratio_from", "ratio_to"],
         dtype={
             "symbol": "string",
             "action_type": "string",
@@ -91,206 +224,291 @@ def load_actions(data_dir: Path, year: int) -> pd.DataFrame:
     )
     return df
 
-def prepare_action_queue(corp_actions_df: pd.DataFrame, year: int) -> Deque[dict]:
+def _bind_action(action_date, symbol: str, action_type: str, rf, rt) -> Callable[[InventoryBook], None]:
+    """Validate one corporate action and return the in-place update it applies to a book."""
+    if action_type == "SPLIT":
+        rf = int(rf)
+        rt = int(rt)
 
-    if corp_actions_df is None or corp_actions_df.empty:
-        return deque()
+        if rf <= 0 or rt <= 0:
+            raise ValueError(f"Invalid SPLIT ratio: {rf} -> {rt} for {symbol} on {action_date}")
 
-    df = corp_actions_df.copy()
-    df = df.dropna(subset=['action_date', 'symbol', 'action_type', 'ratio_from', 'ratio_to']).copy()
+        if rt % rf != 0:
+            raise ValueError(f"SPLIT ratio must be integer multiple: {rf} -> {rt} for {symbol} on {action_date}")
 
-    print(df)
+        k = rt // rf
 
-    df["symbol"] = df["symbol"].astype("string")
-    df["action_type"] = df["action_type"].astype("string")
-    df["action_date"] = pd.to_datetime(df["action_date"])
+        def apply_split(book: InventoryBook) -> None:
+            book.split(k)
 
-    df = df[df["action_date"].dt.year == year].copy()
-    df = df.sort_values(by=["action_date"]).reset_index(drop=True)
+        return apply_split
 
-    return deque(df.to_dict("records"))
+    raise ValueError(f"Unsupported action_type: {action_type} ({symbol} {action_date})")
 
-def apply_corporate_action(action: dict, inventories: Dict[str, Deque[Lot]]) -> None:
-    symbol = str(action["symbol"]).strip()
-    action_type = str(action["action_type"]).strip().upper()
-    action_date = action.get("action_date")
 
-    inventories.setdefault(symbol, deque())
-    inv = inventories[symbol]
+def prepare_action_queue(corp_actions_df: pd.DataFrame, year: int) -> Deque[tuple]:
+    """
+    Actions of `year` sorted by date, as (action_date, symbol, fn) tuples.
 
-    if action_type == "SPLIT":
-        rf = int(action["ratio_from"])
-        rt = int(action["ratio_to"])
+    Each action is validated here once; `fn(book)` applies it in place.
+    """
+    if corp_actions_df is None or corp_actions_df.empty:
+        return deque()
 
-        if rf <= 0 or rt <= 0:
-            raise ValueError(f"Invalid SPLIT ratio: {rf} -> {rt} for {symbol} on {action_date}")
+    df = corp_actions_df.dropna(subset=['action_date', 'symbol', 'action_type', 'ratio_from', 'ratio_to'])
 
-        if rt % rf != 0:
-            raise ValueError(f"SPLIT ratio must be integer multiple: {rf} -> {rt} for {symbol} on {action_date}")
+    action_date = pd.to_datetime(df["action_date"]).to_numpy("datetime64[ns]")
+    in_year = action_date.astype("datetime64[Y]").astype(np.int64) + 1970 == year
+    idx = np.flatnonzero(in_year)
+    idx = idx[np.argsort(action_date[idx], kind="stable")]
 
-        k = rt // rf
+    dates = pd.DatetimeIndex(action_date[idx])
+    symbols = df["symbol"].astype("string").str.strip().to_numpy()[idx]
+    action_types = df["action_type"].astype("string").str.strip().str.upper().to_numpy()[idx]
+    ratio_from = df["ratio_from"].to_numpy(np.int64)[idx]
+    ratio_to = df["ratio_to"].to_numpy(np.int64)[idx]
+
+    return deque(
+        (d, sym, _bind_action(d, sym, t, rf, rt))
+        for d, sym, t, rf, rt in zip(dates, symbols, action_types, ratio_from, ratio_to)
+    )
 
-        for lot in inv:
-            lot.qty = int(lot.qty) * k
-            lot.price = float(lot.price) / k
+def _category_codes(s: pd.Series, upper: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Integer codes and cleaned labels (stripped, optionally upper-cased) of `s`.
 
-    else:
-        raise ValueError(f"Unsupported action_type: {action_type} ({symbol} {action_date})")
+    The loaders read symbol / side as categoricals, so cleaning only touches
+    the categories; raw spellings that clean to the same label share a code.
+    `s` must not hold missing values.
+    """
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("string").astype("category")
+
+    labels = s.cat.categories.astype(str).str.strip()
+    if upper:
+        labels = labels.str.upper()
 
+    new_codes, uniques = pd.factorize(labels)
+    return new_codes[s.cat.codes.to_numpy()], np.asarray(uniques, dtype=object)
 
-def inventory_df_to_queues(inventory_df: pd.DataFrame) -> Dict[str, Deque[Lot]]:
+
+def inventory_df_to_queues(inventory_df: pd.DataFrame) -> Dict[str, InventoryBook]:
     
-    inventories: Dict[str, Deque[Lot]] = defaultdict(deque)
+    inventories: Dict[str, InventoryBook] = defaultdict(InventoryBook)
 
     if inventory_df is None or inventory_df.empty:
         return inventories
 
-    df = inventory_df.sort_values(by=["stock_symbol","transaction_date"]).copy()
+    df = inventory_df.sort_values(by=["stock_symbol","transaction_date"], kind="stable")
+
+    # load_inventory reads stock_symbol as a categorical: find the runs on
+    # its integer codes and build each label string once per symbol
+    symbol = df["stock_symbol"]
+    if not isinstance(symbol.dtype, pd.CategoricalDtype):
+        symbol = symbol.astype("category")
+    codes = symbol.cat.codes.to_numpy()
+    labels = symbol.cat.categories.astype(str)
 
-    for row in df.itertuples(index=False):
-        
-        symbol = str(row.stock_symbol)
-        qty = int(row.qty)
-        price = float(row.price)
-        date = row.transaction_date
+    # rows without a symbol sort last (code -1) and hold no lot
+    n = int(np.count_nonzero(codes >= 0))
+    if n == 0:
+        return inventories
+    codes = codes[:n]
+    df = df.iloc[:n]
+    qty = df["qty"].to_numpy(np.int64)
+    price = df["price"].to_numpy(np.float64)
+    date = df["transaction_date"].to_numpy("datetime64[ns]")
 
-        inventories[symbol].append(Lot(qty=qty, price=price, date=date))
+    # rows are grouped by symbol now: slice each run straight into a book
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], n]
+
+    for i, j in zip(starts, ends):
+        inventories[labels[codes[i]]] = InventoryBook.from_arrays(qty[i:j], price[i:j], date[i:j])
 
     return inventories
 
 def apply_trades_fifo(
     trades_df: pd.DataFrame,
-    inventories: Dict[str, Deque[Lot]],
+    inventories: Dict[str, InventoryBook],
     actions_df: pd.DataFrame | None = None,
     year: int | None = None,
     # NEW: snapshot collector (date-driven)
     snapshot_collector: Optional[SnapshotCollector] = None,
-) -> tuple[Dict[str, Deque[Lot]], pd.DataFrame, Optional[Dict[pd.Timestamp, Dict[str, int]]]]:
+) -> tuple[Dict[str, InventoryBook], pd.DataFrame, Optional[pd.Series]]:
 
     # ---- prepare trades queue ----
-    df = trades_df.copy()
-    df = df.dropna(subset=["stock_symbol", "side", "qty", "price", "transaction_date"]).copy()
-    df["transaction_date"] = pd.to_datetime(df["transaction_date"])
-    df["stock_symbol"] = df["stock_symbol"].astype("string").str.strip()
-    df["side"] = df["side"].astype("string").str.strip().str.upper()
-    df = df.sort_values(by=["transaction_date"]).reset_index(drop=True)
-    trade_q: Deque[dict] = deque(df.to_dict("records"))
+    # dropna / assign / sort each allocate once; stable sort keeps file
+    # order for same-day trades
+    df = trades_df.dropna(subset=["stock_symbol", "side", "qty", "price", "transaction_date"])
+    df = df.assign(
+        transaction_date=pd.to_datetime(df["transaction_date"]),
+    ).sort_values(by=["transaction_date"], ignore_index=True, kind="stable")
+
+    # symbols interned as int codes: the loop indexes a list of books by code
+    # instead of hashing the symbol string into `inventories` per trade
+    trade_symbol_code, trade_symbols = _category_codes(df["stock_symbol"])
+    trade_symbol_code = trade_symbol_code.tolist()
+    books: List[Optional[InventoryBook]] = [None] * len(trade_symbols)
+
+    # side as int8: 0 = BUY, 1 = SELL, -1 = anything else (rejected below)
+    trade_side_code, trade_sides = _category_codes(df["side"], upper=True)
+    trade_code = np.select(
+        [trade_sides == "BUY", trade_sides == "SELL"], [0, 1], default=-1
+    ).astype(np.int8)[trade_side_code].tolist()
+
+    # tolist() converts the typed columns to Python scalars in one pass
+    trade_qty = df["qty"].to_numpy(np.int64).tolist()
+    trade_price = df["price"].to_numpy(np.float64).tolist()
+
+    # column arrays walked with an integer pointer; the normalized day is
+    # computed once here, as an int64 day count, instead of per merge step
+    trade_ts = df["transaction_date"].to_numpy("datetime64[ns]")
+    trade_days = trade_ts.astype("datetime64[D]").astype(np.int64)
+    n_trades = len(df)
 
     # ---- prepare actions queue (only once) ----
     if actions_df is not None and year is not None:
-        action_q: Deque[dict] = prepare_action_queue(actions_df, year)
+        actions = list(prepare_action_queue(actions_df, year))
     else:
-        action_q = deque()
-
-    realized_pnl_records: List[dict] = []
-
-    def _peek_next_event_date() -> Optional[pd.Timestamp]:
-        """Return the next event *date* (normalized) among trade/action queues."""
-        td = trade_q[0]["transaction_date"].normalize() if trade_q else None
-        ad = action_q[0]["action_date"].normalize() if action_q else None
-        if td is None:
-            return ad
-        if ad is None:
-            return td
-        return td if td <= ad else ad
-
-    # ---- merge loop ----
-    # rule: same day -> trade first, then action
-    while trade_q or action_q:
-        next_event_date = _peek_next_event_date()
-
-        # IMPORTANT: capture snapshots for any snapshot_date < next_event_date
-        if snapshot_collector is not None:
-            snapshot_collector.consume_until(next_event_date, inventories)
-
-        td = trade_q[0]["transaction_date"] if trade_q else None
-        ad = action_q[0]["action_date"] if action_q else None
-
-        # action only runs if strictly earlier than next trade date
-        # (same day trade first -> so NOT using <=)
-        if ad is not None and (td is None or ad < td):
-            act = action_q.popleft()
-            apply_corporate_action(act, inventories)
-            continue
-
-        # otherwise process a trade
-        tr = trade_q.popleft()
-        symbol = str(tr["stock_symbol"]).strip()
-        side = str(tr["side"]).upper()
-        qty = int(tr["qty"])
-        price = float(tr["price"])
-        date = tr["transaction_date"]
-
-        inventories.setdefault(symbol, deque())
-        inventory = inventories[symbol]
-
-        if side == "BUY":
-            inventory.append(Lot(qty=qty, price=price, date=date))
-
-        elif side == "SELL":
-            remaining_qty = qty
-
-            while remaining_qty > 0:
-                if not inventory:
-                    raise ValueError(f"Not enough inventory to sell for {symbol} on {date}")
-
-                lot = inventory.popleft()
-                lot_qty = int(lot.qty)
-                lot_price = float(lot.price)
-                lot_date = lot.date
-
-                sell_qty = min(lot_qty, remaining_qty)
-                remaining_qty -= sell_qty
-
-                realized_pnl = round(sell_qty * (price - lot_price), 0)
-
-                remaining_lot_qty = lot_qty - sell_qty
-                if remaining_lot_qty > 0:
-                    inventory.appendleft(Lot(qty=remaining_lot_qty, price=lot_price, date=lot_date))
-
-                realized_pnl_records.append({
-                    "transaction_date": date,
-                    "stock_symbol": symbol,
-                    "sell_qty": sell_qty,
-                    "sell_price": price,
-                    "buy_date": lot_date,
-                    "buy_price": lot_price,
-                    "realized_pnl": realized_pnl,
-                })
-
-        else:
-            raise ValueError(f"Unknown trade side: {side} for {symbol} on {date}")
+        actions = []
+    action_ts = np.array([a[0] for a in actions], dtype="datetime64[ns]")
+    # resolve action symbols to trade codes once; -1 = never traded this
+    # year, that book is looked up by symbol instead
+    trade_code_of = {symbol: i for i, symbol in enumerate(trade_symbols)}
+    action_symbol_code = [trade_code_of.get(a[1], -1) for a in actions]
+    action_days = action_ts.astype("datetime64[D]").astype(np.int64)
+    n_actions = len(actions)
+
+    # realized PnL columns, filled in place. Every row is one lot touched by
+    # a SELL: each lot is used up at most once and each SELL leaves at most
+    # one partial lot, so rows <= opening lots + trades.
+    m = sum(len(book) for book in inventories.values()) + n_trades
+    out_tx_date = np.empty(m, dtype="datetime64[ns]")
+    out_symbol_code = np.empty(m, dtype=np.int64)
+    out_sell_qty = np.empty(m, dtype=np.int64)
+    out_sell_price = np.empty(m, dtype=np.float64)
+    out_buy_date = np.empty(m, dtype="datetime64[ns]")
+    out_buy_price = np.empty(m, dtype=np.float64)
+    out_lot_idx = np.empty(m, dtype=np.int64)
+    out_pnl = np.empty(m, dtype=np.float64)
+    n_out = 0
+
+    # ---- merge plan ----
+    # rule: same day -> trade first, then action. Action k runs right before
+    # trade action_pos[k]; a snapshot day is captured before the first trade
+    # on a later day. Between those cut points trades run back to back.
+    action_pos = np.searchsorted(trade_ts, action_ts, side="right")
+    if snapshot_collector is not None:
+        snap_pos = np.searchsorted(trade_days, snapshot_collector.pending_days().astype(np.int64), side="right")
+    else:
+        snap_pos = np.empty(0, dtype=np.int64)
+    cuts = np.unique(np.concatenate([action_pos, snap_pos, [n_trades]]).astype(np.int64))
+
+    ai = 0
+    run_start = 0
+    for run_stop in cuts.tolist():
+        if run_start < run_stop and snapshot_collector is not None and not snapshot_collector.exhausted:
+            # IMPORTANT: capture snapshots for any snapshot_date < run's first day
+            snapshot_collector.consume_until(int(trade_days[run_start]), inventories)
+
+        for ti in range(run_start, run_stop):
+            # symbol / side are already stripped / upper-cased above
+            symbol_code = trade_symbol_code[ti]
+            code = trade_code[ti]
+            qty = trade_qty[ti]
+            price = trade_price[ti]
+            date = trade_ts[ti]
+
+            inventory = books[symbol_code]
+            if inventory is None:
+                # first trade of this symbol: bind (or create) its book once
+                inventory = books[symbol_code] = _get_book(inventories, trade_symbols[symbol_code])
+
+            if code == 0:
+                inventory.append(qty, price, date)
+
+            elif code == 1:
+                out_start = n_out
+                new_head, n_out, unfilled = fifo_match(
+                    inventory.qty, inventory.price, inventory.head, inventory.tail, qty, price,
+                    out_sell_qty, out_buy_price, out_lot_idx, out_pnl, n_out,
+                )
+                if unfilled > 0:
+                    raise ValueError(f"Not enough inventory to sell for {trade_symbols[symbol_code]} on {pd.Timestamp(date)}")
+                inventory.head = new_head
+                inventory.total -= qty
+
+                out_tx_date[out_start:n_out] = date
+                out_symbol_code[out_start:n_out] = symbol_code
+                out_sell_price[out_start:n_out] = price
+                out_buy_date[out_start:n_out] = inventory.date[out_lot_idx[out_start:n_out]]
+
+            else:
+                raise ValueError(f"Unknown trade side: {trade_sides[trade_side_code[ti]]} for {trade_symbols[symbol_code]} on {pd.Timestamp(date)}")
+
+        # actions scheduled before trade run_stop
+        while ai < n_actions and action_pos[ai] == run_stop:
+            if snapshot_collector is not None and not snapshot_collector.exhausted:
+                snapshot_collector.consume_until(int(action_days[ai]), inventories)
+            _, symbol, fn = actions[ai]
+            symbol_code = action_symbol_code[ai]
+            if symbol_code < 0:
+                fn(_get_book(inventories, symbol))
+            else:
+                book = books[symbol_code]
+                if book is None:
+                    book = books[symbol_code] = _get_book(inventories, symbol)
+                fn(book)
+            ai += 1
+
+        run_start = run_stop
 
     # after finishing all events, capture remaining snapshot dates
-    snapshots_out: Optional[Dict[pd.Timestamp, Dict[str, int]]] = None
+    # (snapshot_date, symbol) -> qty, straight from the collector's flat arrays
+    snapshots_out: Optional[pd.Series] = None
     if snapshot_collector is not None:
         snapshot_collector.finalize(inventories)
-        snapshots_out = snapshot_collector.snapshots
+        snapshots_out = snapshot_collector.to_series()
 
-    return inventories, pd.DataFrame(realized_pnl_records), snapshots_out
+    realized_pnl_df = pd.DataFrame({
+        "transaction_date": out_tx_date[:n_out],
+        "stock_symbol": trade_symbols[out_symbol_code[:n_out]],
+        "sell_qty": out_sell_qty[:n_out],
+        "sell_price": out_sell_price[:n_out],
+        "buy_date": out_buy_date[:n_out],
+        "buy_price": out_buy_price[:n_out],
+        "realized_pnl": np.round(out_pnl[:n_out], 0),
+    })
+
+    return inventories, realized_pnl_df, snapshots_out
 
 
 def save_inventories(data_dir: Path, year:int,
-                     inventories: Dict[str,Deque[Lot]]):
+                     inventories: Dict[str, InventoryBook]):
     path = data_dir / f"{year+1}" / "inventory.csv"
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    records = []
-
-    for symbol, queue in inventories.items():
-        for lot in queue:
-            records.append({
-                "transaction_date": lot.date,
-                "stock_symbol": symbol,
-                "qty": lot.qty,
-                "price": lot.price,
-            })
-
-    inv_df = pd.DataFrame(
-        records,
-        columns=["transaction_date", "stock_symbol", "qty", "price"]
-    )
-    inv_df.to_csv(path, index=False)
+    # straight from the book arrays: one slice per symbol, no per-lot records
+    books = [(symbol, book) for symbol, book in inventories.items() if len(book)]
+    if books:
+        dates = np.concatenate([b.date[b.head:b.tail] for _, b in books])
+        symbols = np.repeat(np.array([s for s, _ in books], dtype=object), [len(b) for _, b in books])
+        qty = np.concatenate([b.qty[b.head:b.tail] for _, b in books])
+        price = np.concatenate([b.price[b.head:b.tail] for _, b in books])
+    else:
+        dates = np.empty(0, dtype="datetime64[ns]")
+        symbols = np.empty(0, dtype=object)
+        qty = np.empty(0, dtype=np.int64)
+        price = np.empty(0, dtype=np.float64)
+
+    inv_df = pd.DataFrame({
+        "transaction_date": dates,
+        "stock_symbol": symbols,
+        "qty": qty,
+        "price": price,
+    })
+    inv_df.to_csv(path, index=False, lineterminator="\n")
     print(f"!!! Saved updated inventory to {path}")
     return path
 
@@ -316,30 +534,30 @@ def save_realized_pnl(
     if realized_pnl_df is None or realized_pnl_df.empty:
         df = pd.DataFrame(columns=columns)
     else:
-        df = realized_pnl_df.copy()
-        df = df[columns]
+        df = realized_pnl_df[columns]
 
-    df.to_csv(path, index=False)
+    df.to_csv(path, index=False, lineterminator="\n")
     return path
 
 
 if __name__ == "__main__":
     data_dir = Path("data")
     year = 2025
-
+    # DataFrame dumps are only worth their formatting cost when debugging
+    debug = bool(os.environ.get("IT_DEBUG"))
 
     print('year:', year)
 
     inv_df = load_inventory(data_dir, year)
     trades_df = load_trades(data_dir, year)
 
-    print("trades_df:"  , trades_df)
-
     inventories = inventory_df_to_queues(inv_df)
-    print("inventories:",inventories)
 
-    for symbol, queue in inventories.items():
-        print(f"Inventory for {symbol}: {list(queue)}")
+    if debug:
+        print("trades_df:"  , trades_df)
+        print("inventories:",inventories)
+        for symbol, queue in inventories.items():
+            print(f"Inventory for {symbol}: {list(queue)}")
 
     actions_df = load_actions(data_dir, year)
 
@@ -362,9 +580,10 @@ if __name__ == "__main__":
         snapshot_collector=collector,
     )
 
-    print("Updated Inventory:", inventory)
-    print("Realized PnL DataFrame:")
-    print(realized_pnl_df)
+    if debug:
+        print("Updated Inventory:", inventory)
+        print("Realized PnL DataFrame:")
+        print(realized_pnl_df)
 
     save_inventories(data_dir, year, inventories)
     save_realized_pnl(data_dir, year, realized_pnl_df)
@@ -1,15 +1,40 @@
 # src/snapshots.py
 from __future__ import annotations
 
-from typing import Dict, Deque, Tuple, Set, List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol
+import numpy as np
 import pandas as pd
 
 
-class HasQty(Protocol):
-    qty: int
+class HasTotalQty(Protocol):
+    def total_qty(self) -> int: ...
 
 
-Inventories = Dict[str, Deque[HasQty]]
+Inventories = Dict[str, HasTotalQty]
+
+_NS_PER_DAY = 86_400_000_000_000
+
+
+def _day_int(d) -> int:
+    """Days since 1970-01-01; plain ints pass through unchanged."""
+    if isinstance(d, (int, np.integer)):
+        return int(d)
+    return pd.Timestamp(d).value // _NS_PER_DAY
+
+
+def snapshots_to_series(snapshots: Dict[pd.Timestamp, Dict[str, int]]) -> pd.Series:
+    """
+    Flatten snapshot_date -> {symbol: qty} into one int64 Series
+    indexed by (snapshot_date, symbol).
+    """
+    keys = [(pd.Timestamp(d).normalize(), s) for d, m in snapshots.items() for s in m]
+    qty = [q for m in snapshots.values() for q in m.values()]
+    return pd.Series(
+        qty,
+        index=pd.MultiIndex.from_tuples(keys, names=["snapshot_date", "symbol"]),
+        dtype="int64",
+        name="eligible_qty",
+    )
 
 
 class SnapshotCollector:
@@ -17,55 +42,116 @@ class SnapshotCollector:
     def __init__(self, snapshot_dates: List[pd.Timestamp] | None):
         snapshot_dates = snapshot_dates or []
 
-        # normalize & sort
+        # normalize, dedupe & sort
         self._dates: List[pd.Timestamp] = sorted(
-            pd.to_datetime(d).normalize() for d in snapshot_dates
+            {pd.to_datetime(d).normalize() for d in snapshot_dates}
+        )
+        # same dates as int64 day counts, so the cutoff checks are int compares
+        self._day_ints = np.asarray(
+            [d.value // _NS_PER_DAY for d in self._dates], dtype=np.int64
         )
         self._i: int = 0  # pointer
 
-        self.snapshots: Dict[pd.Timestamp, Dict[str, int]] = {}
+        # captured snapshots, flat: snapshot k holds the (symbol code, qty)
+        # pairs _snap_sym/_snap_qty[_offsets[k]:_offsets[k+1]] for _dates[k]
+        self._sym_codes: Dict[str, int] = {}
+        self._sym_names: List[str] = []
+        self._snap_sym = np.empty(64, dtype=np.int32)
+        self._snap_qty = np.empty(64, dtype=np.int64)
+        self._offsets: List[int] = [0]
+
+    @property
+    def snapshots(self) -> Dict[pd.Timestamp, Dict[str, int]]:
+        """Captured snapshots as snapshot_date -> {symbol: qty}."""
+        names = self._symbol_names()
+        out: Dict[pd.Timestamp, Dict[str, int]] = {}
+        for k in range(len(self._offsets) - 1):
+            a, b = self._offsets[k], self._offsets[k + 1]
+            out[self._dates[k]] = dict(zip(names[self._snap_sym[a:b]], self._snap_qty[a:b].tolist()))
+        return out
+
+    @property
+    def exhausted(self) -> bool:
+        """True once every snapshot date has been captured."""
+        return self._i >= len(self._day_ints)
 
     def consume_until(
         self,
-        next_event_date: Optional[pd.Timestamp],
+        next_event_date: Optional[pd.Timestamp | int],
         inventories: Inventories,
     ) -> None:
         """
         Capture snapshots for all snapshot_date < next_event_date.
 
+        next_event_date may also be an int day count (days since epoch).
         If next_event_date is None:
           capture all remaining snapshot dates.
         """
-        cutoff = None if next_event_date is None else pd.to_datetime(next_event_date).normalize()
-
-        while self._i < len(self._dates):
-            snap_date = self._dates[self._i]
-
-            # not crossed yet
-            if cutoff is not None and snap_date >= cutoff:
-                break
-
+        n = len(self._day_ints)
+        if next_event_date is None:
+            stop = n
+        else:
+            cutoff = _day_int(next_event_date)
+            stop = self._i
+            # not crossed yet once day >= cutoff
+            while stop < n and self._day_ints[stop] < cutoff:
+                stop += 1
+
+        while self._i < stop:
             # capture full inventory state
-            self.snapshots[snap_date] = self._snapshot_inventory(inventories)
-
+            self._capture(inventories)
             self._i += 1
 
+    def pending_days(self) -> np.ndarray:
+        """Snapshot dates not captured yet, as sorted datetime64[D]."""
+        return self._day_ints[self._i:].astype("datetime64[D]")
+
     def finalize(self, inventories: Inventories) -> None:
         """Capture all remaining snapshot dates after the last event."""
         self.consume_until(None, inventories)
 
-    @staticmethod
-    def _snapshot_inventory(inventories: Inventories) -> Dict[str, int]:
-        """
-        Convert inventories to:
-          symbol -> total_qty
-        """
-        snap: Dict[str, int] = {}
-        for symbol, lots in inventories.items():
-            total = sum(int(lot.qty) for lot in lots)
-            if total != 0:
-                snap[symbol] = int(total)
-        return snap
+    def to_series(self) -> pd.Series:
+        """Captured snapshots as a (snapshot_date, symbol) -> qty Series."""
+        n = len(self._offsets) - 1
+        end = self._offsets[-1]
+        dates = pd.DatetimeIndex(self._dates[:n]).repeat(np.diff(self._offsets))
+        return pd.Series(
+            self._snap_qty[:end],
+            index=pd.MultiIndex.from_arrays(
+                [dates, self._symbol_names()[self._snap_sym[:end]]],
+                names=["snapshot_date", "symbol"],
+            ),
+            dtype="int64",
+            name="eligible_qty",
+        )
+
+    def _symbol_names(self) -> np.ndarray:
+        return np.array(self._sym_names, dtype=object)
+
+    def _code(self, symbol: str) -> int:
+        code = self._sym_codes.get(symbol)
+        if code is None:
+            code = self._sym_codes[symbol] = len(self._sym_names)
+            self._sym_names.append(symbol)
+        return code
+
+    def _capture(self, inventories: Inventories) -> None:
+        """Append the non-zero symbol -> total_qty of `inventories` as one snapshot row."""
+        n = len(inventories)
+        codes = np.fromiter((self._code(symbol) for symbol in inventories), dtype=np.int32, count=n)
+        qty = np.fromiter((lots.total_qty() for lots in inventories.values()), dtype=np.int64, count=n)
+        nz = np.flatnonzero(qty)
+
+        start = self._offsets[-1]
+        end = start + len(nz)
+        if end > len(self._snap_qty):
+            capacity = max(2 * len(self._snap_qty), end)
+            self._snap_sym = np.resize(self._snap_sym, capacity)
+            self._snap_qty = np.resize(self._snap_qty, capacity)
+
+        self._snap_sym[start:end] = codes[nz]
+        self._snap_qty[start:end] = qty[nz]
+        self._offsets.append(end)
 
 
 if __name__ == "__main__":
@@ -83,22 +169,28 @@ if __name__ == "__main__":
     collector = SnapshotCollector(snapshot_dates)
 
     # --- 2. fake inventories ---
-    class Lot:
-        def __init__(self, qty: int):
-            self.qty = qty
+    class Lots:
+        def __init__(self):
+            self.lots = deque()
+
+        def append(self, qty: int):
+            self.lots.append(qty)
+
+        def total_qty(self) -> int:
+            return sum(self.lots)
 
         def __repr__(self):
-            return f"Lot(qty={self.qty})"
+            return f"Lots({list(self.lots)})"
 
     inventories: Inventories = {
-        "2330": deque(),
-        "0050": deque(),
+        "2330": Lots(),
+        "0050": Lots(),
     }
 
     # --- 3. before first snapshot ---
     print('買賣操作')
-    inventories["2330"].append(Lot(100))
-    inventories["0050"].append(Lot(50))
+    inventories["2330"].append(100)
+    inventories["0050"].append(50)
 
     
     print('買賣操作實際庫存', inventories)
@@ -112,8 +204,8 @@ if __name__ == "__main__":
     
     # --- 4. inventory changes ---
     # simulate sell
-    inventories["2330"].append(Lot(-20))   # total = 80
-    inventories["0050"].append(Lot(30))    # total = 80
+    inventories["2330"].append(-20)   # total = 80
+    inventories["0050"].append(30)    # total = 80
 
     print('買賣操作實際庫存', inventories)
 